@@ -1,36 +1,29 @@
+from typing import NamedTuple
+
 import streamlit as st
 import numpy as np
-import pandas as pd
 
 # --- Constants ---
 MAX_SCORE = 1000
 NUM_DUMMY_UNIVERSITIES = 1000  # Number of hypothetical universities for percentile calculation
 
 # --- Normalization Functions ---
-def min_max_scale(value, min_val, max_val):
-    """Scales a value to a 0-10 range using Min-Max scaling."""
-    if max_val == min_val:
-        return 0.0  # Avoid division by zero if all values are the same
-    return 10 * (value - min_val) / (max_val - min_val)
-
-def percentile_score(value, data_series):
-    """Calculates the percentile rank of a value within a given data series and scales to 0-10."""
-    data_series = np.array(data_series)
-    if len(data_series) == 0:
-        return 0.0
-    
-    # Count values less than 'value' and values equal to 'value'
-    less_than_count = np.sum(data_series < value)
-    equal_to_count = np.sum(data_series == value)
-    
+def percentile_score(value, sorted_ref: np.ndarray):
+    """Calculates the percentile rank of a value within a non-empty, pre-sorted float64 array and scales to 0-10."""
+    assert sorted_ref.dtype == np.float64  # Stripped under python -O
+
+    # Count values less than 'value' and values equal to 'value' via binary search
+    less_than_count = np.searchsorted(sorted_ref, value, side="left")
+    equal_to_count = np.searchsorted(sorted_ref, value, side="right") - less_than_count
+
     # Percentile rank formula: (count_less_than + 0.5 * count_equal_to) / total_count
-    percentile_rank = (less_than_count + 0.5 * equal_to_count) / len(data_series)
+    percentile_rank = (less_than_count + 0.5 * equal_to_count) / sorted_ref.size
     return 10 * percentile_rank  # Scale to 0-10
 
 def survey_adjust(avg_rating):
     """Transforms an average Likert scale rating (1-5) to a 0-10 score."""
     # Score = 2.5 * (Avg. Rating - 1)
-    return 2.5 * (avg_rating - 1)
+    return 2.5 * (avg_rating - 1)  # Works elementwise on arrays as well as scalars
 
 # --- Dummy Data Generation for Percentile Calculation ---
 # These ranges are illustrative and can be adjusted to reflect realistic distributions
@@ -45,125 +38,303 @@ dummy_data_ranges = {
     "Funding_Opportunities": (0, 10000)  # average grants per student
 }
 
-# Generate random dummy data for the specified number of universities
-dummy_data = {}
-for metric, (min_val, max_val) in dummy_data_ranges.items():
-    dummy_data[metric] = np.random.uniform(min_val, max_val, NUM_DUMMY_UNIVERSITIES)
+FACTORS = ("QTF", "TM", "PS", "CC", "RO")
+
+@st.cache_data(show_spinner=False)
+def build_dummy_data(n, seed=0):
+    """Generates seeded, pre-sorted dummy sub-metric data for percentile calculation."""
+    rng = np.random.default_rng(seed)
+    lo = np.array([min_val for min_val, _ in dummy_data_ranges.values()], dtype=np.float64)
+    hi = np.array([max_val for _, max_val in dummy_data_ranges.values()], dtype=np.float64)
+    # One (metrics x n) draw scaled row-wise to each metric's range, then sorted in place per row
+    bulk = lo[:, None] + rng.random((len(dummy_data_ranges), n)) * (hi - lo)[:, None]
+    bulk.sort(axis=1)
+    return dict(zip(dummy_data_ranges, bulk))
+
+@st.cache_data(show_spinner=False)
+def build_dummy_factor_scores(n, seed=1):
+    """Generates seeded dummy overall factor scores (0-10) for peer adjustment, one sorted row per factor."""
+    rng = np.random.default_rng(seed)
+    refs = rng.uniform(0, 10, (len(FACTORS), n))
+    refs.sort(axis=1)
+    return refs
+
+# Generate dummy data for the specified number of universities (cached across reruns).
+# No spinner: this runs before st.set_page_config, which must be the first Streamlit command.
+dummy_data = build_dummy_data(NUM_DUMMY_UNIVERSITIES)
+
+# --- Batched Sub-Metric Normalization ---
+# All 22 raw sub-metric inputs are packed into one vector in this order:
+#   QTF: expertise h-index, clarity rating, approachability feedback
+#   TM:  lecture effectiveness, discussion-based %, practical sessions
+#   PS:  placement rate, employer reputation, industry partnerships, alumni salary, entrepreneurial success
+#   CC:  inclusion index, representation, engagement, retention, cultural competency
+#   RO:  research expenditure, PhD attainment, research output (FWCI), lab accessibility,
+#        funding opportunities, mentorship programs
+QTF_SLICE, TM_SLICE, PS_SLICE, CC_SLICE, RO_SLICE = slice(0, 3), slice(3, 6), slice(6, 11), slice(11, 16), slice(16, 22)
+
+# Min-Max scaled inputs and their (min, max) ranges
+MM_IDX = np.array([0, 8, 10, 16, 17, 20])
+MM_LO = np.array([
+    dummy_data_ranges["Expertise_h_index"][0],
+    0,
+    0,
+    dummy_data_ranges["Research_Funding_per_student"][0],
+    dummy_data_ranges["PhD_Conferred"][0],
+    dummy_data_ranges["Funding_Opportunities"][0],
+], dtype=np.float64)
+MM_HI = np.array([
+    dummy_data_ranges["Expertise_h_index"][1],
+    100,  # Assuming max 100 partnerships for scaling
+    20,  # Assuming max 20 startups for scaling
+    dummy_data_ranges["Research_Funding_per_student"][1],
+    dummy_data_ranges["PhD_Conferred"][1],
+    dummy_data_ranges["Funding_Opportunities"][1],
+], dtype=np.float64)
+# All ranges are fixed and non-degenerate, so the scaling below needs no divide-by-zero guard
+if not np.all(MM_HI > MM_LO):
+    raise ValueError("Min-Max ranges must satisfy max > min for every scaled sub-metric")
+
+# Likert (1-5) survey inputs
+SV_IDX = np.array([1, 7, 11, 19, 21])
+
+# Percentile-scored inputs and the dummy reference each is ranked against
+PCT_INPUTS = (
+    (2, "Approachability_feedback_scores"),
+    (6, "Placement_Rate"),
+    (9, "Alumni_Salary"),
+    (18, "Research_Output_FWCI"),
+)
+
+def _normalize_all(raw):
+    """Normalizes all 22 raw sub-metric inputs to a 0-10 scale in one batch."""
+    # Inputs not listed above are assumed to already be on a 0-10 scale and pass through unchanged
+    normalized = raw.astype(np.float64, copy=True)
+    normalized[MM_IDX] = 10.0 * (raw[MM_IDX] - MM_LO) / (MM_HI - MM_LO)
+    normalized[SV_IDX] = survey_adjust(raw[SV_IDX])
+    for idx, metric in PCT_INPUTS:
+        normalized[idx] = percentile_score(raw[idx], dummy_data[metric])
+    return normalized
+
+# --- Local Factor Weights ---
+# Plain-float tuples so the weighted sums stay in Python float arithmetic.
+
+# Expertise (40%), Clarity (30%), Approachability (30%)
+_QTF_W = (0.40, 0.30, 0.30)
+# Lectures (30%), Discussions (40%), Practical (30%)
+_TM_W = (0.30, 0.40, 0.30)
+# Adjusted for 5 sub-metrics as per report:
+# Graduate Employment Rate (0.30), Employer Reputation (0.20), Industry Partnerships (0.20),
+# Alumni Career Progression (0.15), Start-up & Entrepreneurial Success (0.15)
+_PS_W = (0.30, 0.20, 0.20, 0.15, 0.15)
+# Adjusted for 5 sub-metrics as per report:
+# Inclusion Index (0.30), Representation Quotient (0.20), Student Engagement (0.20),
+# Retention Ratio (0.15), Cultural Competency (0.15)
+_CC_W = (0.30, 0.20, 0.20, 0.15, 0.15)
+# Adjusted for 6 sub-metrics as per report:
+# Research Expenditure (0.20), PhD Attainment (0.15), Research Output (0.25),
+# Lab Accessibility (0.15), Funding Opportunities (0.15), Mentorship Programs (0.10)
+_RO_W = (0.20, 0.15, 0.25, 0.15, 0.15, 0.10)
+
+# --- Sub-Metric Score Tuples ---
+# Fixed-field containers for the normalized sub-metric scores of each factor.
+# The matching *_LABELS tuples hold the display names used in the results panel.
+
+class QTFScores(NamedTuple):
+    expertise: float
+    clarity: float
+    approachability: float
+
+QTF_LABELS = (
+    "Expertise Score",
+    "Clarity Score",
+    "Approachability Score",
+)
+
+class TMScores(NamedTuple):
+    lecture: float
+    discussion: float
+    practical: float
+
+TM_LABELS = (
+    "Lecture Effectiveness Score",
+    "Discussion-based Score",
+    "Practical Sessions Score",
+)
+
+class PSScores(NamedTuple):
+    placement: float
+    employer: float
+    industry: float
+    alumni_salary: float
+    entrepreneurial: float
+
+PS_LABELS = (
+    "Placement Rate Score",
+    "Employer Reputation Score",
+    "Industry Partnerships Score",
+    "Alumni Salary Progression Score",
+    "Entrepreneurial Success Score",
+)
+
+class CCScores(NamedTuple):
+    inclusion: float
+    representation: float
+    engagement: float
+    retention: float
+    cultural: float
+
+CC_LABELS = (
+    "Inclusion Index Score",
+    "Representation Quotient Score",
+    "Student Engagement Rate Score",
+    "Retention Ratio of Diverse Groups Score",
+    "Cultural Competency Training Completion Score",
+)
+
+class ROScores(NamedTuple):
+    research_exp: float
+    phd: float
+    research_output: float
+    lab: float
+    funding: float
+    mentorship: float
+
+RO_LABELS = (
+    "Research Expenditure Score",
+    "PhD Attainment Score",
+    "Research Output (FWCI/CNCI) Score",
+    "Lab/Resource Accessibility Score",
+    "Funding Opportunities Score",
+    "Mentorship Programs Score",
+)
+
+# Results panel sections, in the order the factor sub-scores are stored
+SUB_SCORE_SECTIONS = (
+    ("Quality of Teaching Faculty", QTF_LABELS),
+    ("Teaching Methods", TM_LABELS),
+    ("Placement Services", PS_LABELS),
+    ("Campus Culture", CC_LABELS),
+    ("Research Opportunities", RO_LABELS),
+)
 
 # --- Factor Calculation Functions ---
-# Each function calculates the score for a main factor based on its sub-metrics and local weights.
-# It also returns the normalized sub-metric scores for transparency.
+# Each function combines the normalized (0-10) sub-metric scores of a main factor using its local weights.
+# It also returns the sub-metric scores, as a NamedTuple, for transparency.
 
-def calculate_qtf(expertise_h_index, clarity_avg_rating, approachability_feedback_score):
+def calculate_qtf(expertise_score, clarity_score, approachability_score):
     """Calculates Quality of Teaching Faculty (QTF) score."""
-    # Sub-metric Normalization (to 0-10)
-    expertise_score = min_max_scale(expertise_h_index, *dummy_data_ranges["Expertise_h_index"])
-    clarity_score = survey_adjust(clarity_avg_rating)  # Input 1-5, output 0-10
-    approachability_score = percentile_score(approachability_feedback_score, dummy_data["Approachability_feedback_scores"])
-
-    # Local Weights: Expertise (40%), Clarity (30%), Approachability (30%)
-    qtf_score = (0.40 * expertise_score +
-                 0.30 * clarity_score +
-                 0.30 * approachability_score)
-    return qtf_score, {
-        "Expertise Score": expertise_score,
-        "Clarity Score": clarity_score,
-        "Approachability Score": approachability_score
-    }
+    qtf_score = (_QTF_W[0] * expertise_score +
+                 _QTF_W[1] * clarity_score +
+                 _QTF_W[2] * approachability_score)
+    return qtf_score, QTFScores(expertise_score, clarity_score, approachability_score)
 
-def calculate_tm(lecture_effectiveness, discussion_based_pct, practical_sessions_hours):
+def calculate_tm(lecture_score, discussion_score, practical_score):
     """Calculates Teaching Methods (TM) score."""
-    # Sub-metric Normalization (assuming inputs are already on a 0-10 scale after internal transformations)
-    lecture_score = lecture_effectiveness
-    discussion_score = discussion_based_pct
-    practical_score = practical_sessions_hours
-
-    # Local Weights: Lectures (30%), Discussions (40%), Practical (30%)
-    tm_score = (0.30 * lecture_score +
-                0.40 * discussion_score +
-                0.30 * practical_score)
-    return tm_score, {
-        "Lecture Effectiveness Score": lecture_score,
-        "Discussion-based Score": discussion_score,
-        "Practical Sessions Score": practical_score
-    }
+    tm_score = (_TM_W[0] * lecture_score +
+                _TM_W[1] * discussion_score +
+                _TM_W[2] * practical_score)
+    return tm_score, TMScores(lecture_score, discussion_score, practical_score)
 
-def calculate_ps(placement_rate, employer_reputation, industry_partnerships, alumni_salary, entrepreneurial_success):
+def calculate_ps(placement_score, employer_score, industry_score, alumni_salary_score, entrepreneurial_score):
     """Calculates University's Placement Services (PS) score."""
-    # Sub-metric Normalization (to 0-10)
-    placement_score = percentile_score(placement_rate, dummy_data["Placement_Rate"])
-    employer_score = survey_adjust(employer_reputation)  # Input 1-5, output 0-10
-    industry_score = min_max_scale(industry_partnerships, 0, 100)  # Assuming max 100 partnerships for scaling
-    alumni_salary_score = percentile_score(alumni_salary, dummy_data["Alumni_Salary"])
-    entrepreneurial_score = min_max_scale(entrepreneurial_success, 0, 20)  # Assuming max 20 startups for scaling
-
-    # Local Weights (adjusted for 5 sub-metrics as per report):
-    # Graduate Employment Rate (0.30), Employer Reputation (0.20), Industry Partnerships (0.20),
-    # Alumni Career Progression (0.15), Start-up & Entrepreneurial Success (0.15)
-    ps_score = (0.30 * placement_score +
-                0.20 * employer_score +
-                0.20 * industry_score +
-                0.15 * alumni_salary_score +
-                0.15 * entrepreneurial_score)
-    return ps_score, {
-        "Placement Rate Score": placement_score,
-        "Employer Reputation Score": employer_score,
-        "Industry Partnerships Score": industry_score,
-        "Alumni Salary Progression Score": alumni_salary_score,
-        "Entrepreneurial Success Score": entrepreneurial_score
-    }
-
-def calculate_cc(inclusion_index, representation_quotient, student_engagement_rate, retention_ratio_diverse_groups, cultural_competency_completion):
+    ps_score = (_PS_W[0] * placement_score +
+                _PS_W[1] * employer_score +
+                _PS_W[2] * industry_score +
+                _PS_W[3] * alumni_salary_score +
+                _PS_W[4] * entrepreneurial_score)
+    return ps_score, PSScores(placement_score, employer_score, industry_score, alumni_salary_score, entrepreneurial_score)
+
+def calculate_cc(inclusion_score, representation_score, engagement_score, retention_score, cultural_score):
     """Calculates Campus Culture (CC) score."""
-    # Sub-metric Normalization (assuming inputs are already on a 0-10 scale for percentages)
-    inclusion_score = survey_adjust(inclusion_index)  # Input 1-5, output 0-10
-    representation_score = representation_quotient
-    engagement_score = student_engagement_rate
-    retention_score = retention_ratio_diverse_groups
-    cultural_score = cultural_competency_completion
-
-    # Local Weights (adjusted for 5 sub-metrics as per report):
-    # Inclusion Index (0.30), Representation Quotient (0.20), Student Engagement (0.20),
-    # Retention Ratio (0.15), Cultural Competency (0.15)
-    cc_score = (0.30 * inclusion_score +
-                0.20 * representation_score +
-                0.20 * engagement_score +
-                0.15 * retention_score +
-                0.15 * cultural_score)
-    return cc_score, {
-        "Inclusion Index Score": inclusion_score,
-        "Representation Quotient Score": representation_score,
-        "Student Engagement Rate Score": engagement_score,
-        "Retention Ratio of Diverse Groups Score": retention_score,
-        "Cultural Competency Training Completion Score": cultural_score
+    cc_score = (_CC_W[0] * inclusion_score +
+                _CC_W[1] * representation_score +
+                _CC_W[2] * engagement_score +
+                _CC_W[3] * retention_score +
+                _CC_W[4] * cultural_score)
+    return cc_score, CCScores(inclusion_score, representation_score, engagement_score, retention_score, cultural_score)
+
+def calculate_ro(research_exp_score, phd_score, research_output_score, lab_score, funding_score, mentorship_score):
+    """Calculates Research Opportunities (RO) score."""
+    ro_score = (_RO_W[0] * research_exp_score +
+                _RO_W[1] * phd_score +
+                _RO_W[2] * research_output_score +
+                _RO_W[3] * lab_score +
+                _RO_W[4] * funding_score +
+                _RO_W[5] * mentorship_score)
+    return ro_score, ROScores(research_exp_score, phd_score, research_output_score, lab_score, funding_score, mentorship_score)
+
+# --- Score Computation ---
+# st.cache_data keys only on the function source and its arguments, not on the module-level
+# constants read here (dummy_data, MM_LO/MM_HI, the local factor weights). Restart the server
+# (or clear the cache) after editing those constants, otherwise stale scores are returned.
+
+@st.cache_data(max_entries=128)
+def _score_all(inputs: tuple, weights: tuple) -> dict:
+    """Computes the final score and its intermediate results from the 22 raw inputs and the global weights (FACTORS order)."""
+    # Normalize all sub-metrics (0-10) in one batch
+    normalized = _normalize_all(np.array(inputs, dtype=np.float64)).tolist()
+
+    # Calculate raw factor scores (0-10)
+    qtf_score_raw, qtf_sub_scores = calculate_qtf(*normalized[QTF_SLICE])
+    tm_score_raw, tm_sub_scores = calculate_tm(*normalized[TM_SLICE])
+    ps_score_raw, ps_sub_scores = calculate_ps(*normalized[PS_SLICE])
+    cc_score_raw, cc_sub_scores = calculate_cc(*normalized[CC_SLICE])
+    ro_score_raw, ro_sub_scores = calculate_ro(*normalized[RO_SLICE])
+
+    raw_factor_scores = {
+        "QTF": qtf_score_raw,
+        "TM": tm_score_raw,
+        "PS": ps_score_raw,
+        "CC": cc_score_raw,
+        "RO": ro_score_raw
     }
 
-def calculate_ro(research_expenditure, phd_attainment, research_output_fwci, lab_accessibility, funding_opportunities, mentorship_programs):
-    """Calculates Research Opportunities (RO) score."""
-    # Sub-metric Normalization (to 0-10)
-    research_exp_score = min_max_scale(research_expenditure, *dummy_data_ranges["Research_Funding_per_student"])
-    phd_score = min_max_scale(phd_attainment, *dummy_data_ranges["PhD_Conferred"])
-    research_output_score = percentile_score(research_output_fwci, dummy_data["Research_Output_FWCI"])
-    lab_score = survey_adjust(lab_accessibility)  # Input 1-5, output 0-10
-    funding_score = min_max_scale(funding_opportunities, *dummy_data_ranges["Funding_Opportunities"])
-    mentorship_score = survey_adjust(mentorship_programs)  # Input 1-5, output 0-10
-
-    # Local Weights (adjusted for 6 sub-metrics as per report):
-    # Research Expenditure (0.20), PhD Attainment (0.15), Research Output (0.25),
-    # Lab Accessibility (0.15), Funding Opportunities (0.15), Mentorship Programs (0.10)
-    ro_score = (0.20 * research_exp_score +
-                0.15 * phd_score +
-                0.25 * research_output_score +
-                0.15 * lab_score +
-                0.15 * funding_score +
-                0.10 * mentorship_score)
-    return ro_score, {
-        "Research Expenditure Score": research_exp_score,
-        "PhD Attainment Score": phd_score,
-        "Research Output (FWCI/CNCI) Score": research_output_score,
-        "Lab/Resource Accessibility Score": lab_score,
-        "Funding Opportunities Score": funding_score,
-        "Mentorship Programs Score": mentorship_score
+    # Dummy data for overall factor scores for percentile calculation, stacked as (factors x n)
+    # This simulates a distribution of scores for other universities for each factor
+    dummy_overall_factor_scores = build_dummy_factor_scores(NUM_DUMMY_UNIVERSITIES)
+
+    # Percentile(F_i) on a 0-10 scale against each factor's row of the stacked reference
+    raw_vec = np.array([raw_factor_scores[f] for f in FACTORS], dtype=np.float64)
+    percentile_vec = np.array([percentile_score(score_raw, reference)
+                               for score_raw, reference in zip(raw_vec, dummy_overall_factor_scores)])
+
+    # Peer-Adjusted Scoring: F_i' = 0.7 * F_i + 0.3 * Percentile(F_i)
+    scores_vec = 0.7 * raw_vec + 0.3 * percentile_vec
+    adjusted_factor_scores = dict(zip(FACTORS, scores_vec.tolist()))
+
+    # Non-Linear Aggregation
+    # Base Score: Base = sum(w_i * F_i')
+    base_score = float(np.array(weights, dtype=np.float64) @ scores_vec)
+
+    # Synergy Bonus: If >=3 factors score >7
+    high_scoring_factors = scores_vec[scores_vec > 7.0]
+    synergy_bonus = 0.0
+    if high_scoring_factors.size >= 3:
+        # Take the average of the top 3 high-scoring factors
+        avg_top_3 = np.partition(high_scoring_factors, -3)[-3:].mean()
+        synergy_bonus = max(0.0, 0.5 * (avg_top_3 - 7))  # Ensure bonus is not negative
+
+    # Penalty: For any factor <3
+    penalty = 0.2 * float((scores_vec < 3.0).sum())
+
+    # Final Score (0-10 scale)
+    final_score_0_10 = base_score + synergy_bonus - penalty
+    
+    # Ensure final score is within 0-10 range
+    final_score_0_10 = max(0, min(10, final_score_0_10))
+
+    # Scale to 1000 max
+    final_score_1000 = (final_score_0_10 / 10) * MAX_SCORE
+    
+    return {
+        "final_score_1000": final_score_1000,
+        "sub_scores": (qtf_sub_scores, tm_sub_scores, ps_sub_scores, cc_sub_scores, ro_sub_scores),
+        "raw_factor_scores": raw_factor_scores,
+        "adjusted_factor_scores": adjusted_factor_scores,
+        "base_score": base_score,
+        "synergy_bonus": synergy_bonus,
+        "penalty": penalty,
     }
 
 # --- Streamlit App Layout ---
@@ -190,172 +361,120 @@ global_weights_presets = {
 
 current_weights = {}
 if weight_scheme == "Custom":
-    st.sidebar.subheader("Custom Global Weights (Sum to 100%)")
-    custom_qtf = st.sidebar.slider("Quality of Teaching Faculty (QTF)", 0, 100, 25)
-    custom_tm = st.sidebar.slider("Teaching Methods (TM)", 0, 100, 20)
-    custom_ps = st.sidebar.slider("Placement Services (PS)", 0, 100, 20)
-    custom_cc = st.sidebar.slider("Campus Culture (CC)", 0, 100, 15)
-    custom_ro = st.sidebar.slider("Research Opportunities (RO)", 0, 100, 20)
-    
-    total_custom_weight = custom_qtf + custom_tm + custom_ps + custom_cc + custom_ro
+    # Sliders live in a form so dragging them doesn't rerun the app until the weights are applied
+    with st.sidebar.form("custom_weights"):
+        st.subheader("Custom Global Weights (Sum to 100%)")
+        custom_qtf = st.slider("Quality of Teaching Faculty (QTF)", 0, 100, 25)
+        custom_tm = st.slider("Teaching Methods (TM)", 0, 100, 20)
+        custom_ps = st.slider("Placement Services (PS)", 0, 100, 20)
+        custom_cc = st.slider("Campus Culture (CC)", 0, 100, 15)
+        custom_ro = st.slider("Research Opportunities (RO)", 0, 100, 20)
+        st.caption("Apply custom weights before calculating; slider changes that haven't been applied are ignored.")
+        st.form_submit_button("Apply Custom Weights")
+
+    raw_custom_weights = np.array([custom_qtf, custom_tm, custom_ps, custom_cc, custom_ro], dtype=np.float64)
+    total_custom_weight = raw_custom_weights.sum()
     if total_custom_weight != 100:
-        st.sidebar.warning(f"Custom weights sum to {total_custom_weight}%. Adjusting to 100% for calculation.")
-        # Normalize if not 100 to allow calculation, but warn user
-        norm_factor = 100 / total_custom_weight if total_custom_weight > 0 else 0
-        current_weights = {
-            "QTF": custom_qtf * norm_factor / 100,
-            "TM": custom_tm * norm_factor / 100,
-            "PS": custom_ps * norm_factor / 100,
-            "CC": custom_cc * norm_factor / 100,
-            "RO": custom_ro * norm_factor / 100
-        }
-    else:
-        current_weights = {
-            "QTF": custom_qtf / 100,
-            "TM": custom_tm / 100,
-            "PS": custom_ps / 100,
-            "CC": custom_cc / 100,
-            "RO": custom_ro / 100
-        }
+        st.sidebar.warning(f"Custom weights sum to {total_custom_weight:.0f}%. Adjusting to 100% for calculation.")
+    # Normalize to sum to 1 (a no-op rescale when the sliders already total 100%)
+    weights_vec = raw_custom_weights / total_custom_weight if total_custom_weight > 0 else np.zeros(len(FACTORS))
+    current_weights = dict(zip(FACTORS, weights_vec))
 else:
     current_weights = global_weights_presets[weight_scheme]
+    # Global weights as a vector in FACTORS order for the base-score dot product
+    weights_vec = np.fromiter((current_weights[f] for f in FACTORS), dtype=np.float64, count=len(FACTORS))
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Current Global Weights:")
 for factor, weight in current_weights.items():
     st.sidebar.write(f"{factor}: {weight*100:.1f}%")
 
-# Input sections for each factor in main columns
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.subheader("Factor 1: Quality of Teaching Faculty (QTF)")
-    qtf_expertise_h_index = st.number_input("Expertise (h-index, e.g., 1-50)", min_value=1.0, max_value=50.0, value=25.0, step=1.0, key="qtf_exp")
-    qtf_clarity_avg_rating = st.number_input("Clarity (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.0, step=0.1, key="qtf_clarity")
-    qtf_approachability_feedback_score = st.number_input("Approachability (Student Feedback Score 0-10)", min_value=0.0, max_value=10.0, value=7.0, step=0.1, key="qtf_app")
-
-with col2:
-    st.subheader("Factor 2: Teaching Methods (TM)")
-    tm_lecture_effectiveness = st.number_input("Lecture Effectiveness (0-10)", min_value=0.0, max_value=10.0, value=7.5, step=0.1, key="tm_lec")
-    tm_discussion_based_pct = st.number_input("Discussion-based (% courses with seminars 0-10)", min_value=0.0, max_value=10.0, value=6.0, step=0.1, key="tm_disc")
-    tm_practical_sessions_hours = st.number_input("Practical Sessions (Lab/fieldwork hours per course 0-10)", min_value=0.0, max_value=10.0, value=8.0, step=0.1, key="tm_prac")
-
-with col3:
-    st.subheader("Factor 3: University's Placement Services (PS)")
-    ps_placement_rate = st.number_input("Graduate Employment Rate (e.g., 0.5-0.99)", min_value=0.0, max_value=1.0, value=0.85, step=0.01, key="ps_place")
-    ps_employer_reputation = st.number_input("Employer Reputation (Avg. Rating 1-5)", min_value=1.0, max_value=5.0, value=3.8, step=0.1, key="ps_emp")
-    ps_industry_partnerships = st.number_input("Industry Partnerships (Number, e.g., 0-100)", min_value=0, max_value=100, value=50, step=1, key="ps_ind")
-    ps_alumni_salary = st.number_input("Alumni Career Progression (Avg. Salary, e.g., 50000-200000)", min_value=0.0, max_value=300000.0, value=75000.0, step=1000.0, key="ps_alumni")
-    ps_entrepreneurial_success = st.number_input("Entrepreneurial Success (Number of student-founded ventures, e.g., 0-20)", min_value=0, max_value=50, value=5, step=1, key="ps_ent")
-
-col4, col5 = st.columns(2)
-
-with col4:
-    st.subheader("Factor 4: Campus Culture (CC)")
-    cc_inclusion_index = st.number_input("Inclusion Index (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.2, step=0.1, key="cc_inc")
-    cc_representation_quotient = st.number_input("Representation Quotient (% diverse students/faculty 0-10)", min_value=0.0, max_value=10.0, value=7.0, step=0.1, key="cc_rep")
-    cc_student_engagement_rate = st.number_input("Student Engagement Rate (% active in clubs/activities 0-10)", min_value=0.0, max_value=10.0, value=8.0, step=0.1, key="cc_eng")
-    cc_retention_ratio_diverse_groups = st.number_input("Retention Ratio of Diverse Groups (% retained 0-10)", min_value=0.0, max_value=10.0, value=7.5, step=0.1, key="cc_ret")
-    cc_cultural_competency_completion = st.number_input("Cultural Competency Training Completion (% students 0-10)", min_value=0.0, max_value=10.0, value=6.5, step=0.1, key="cc_cult")
-
-with col5:
-    st.subheader("Factor 5: Research Opportunities (RO)")
-    ro_research_expenditure = st.number_input("Research Expenditure (per student, e.g., 1000-50000)", min_value=0.0, max_value=100000.0, value=25000.0, step=100.0, key="ro_exp")
-    ro_phd_attainment = st.number_input("PhD Attainment (Number of PhDs conferred annually, e.g., 10-500)", min_value=0, max_value=1000, value=200, step=1, key="ro_phd")
-    ro_research_output_fwci = st.number_input("Research Output (FWCI/CNCI, e.g., 0.1-5.0)", min_value=0.0, max_value=10.0, value=2.5, step=0.1, key="ro_fwci")
-    ro_lab_accessibility = st.number_input("Lab/Resource Accessibility (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.5, step=0.1, key="ro_lab")
-    ro_funding_opportunities = st.number_input("Funding Opportunities (Avg. internal/external grants per student, e.g., 0-10000)", min_value=0.0, max_value=20000.0, value=5000.0, step=100.0, key="ro_fund")
-    ro_mentorship_programs = st.number_input("Mentorship Programs (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.0, step=0.1, key="ro_ment")
-
-st.markdown("---")
-
-if st.button("Calculate University Score"):
-    # Calculate raw factor scores (0-10)
-    qtf_score_raw, qtf_sub_scores = calculate_qtf(qtf_expertise_h_index, qtf_clarity_avg_rating, qtf_approachability_feedback_score)
-    tm_score_raw, tm_sub_scores = calculate_tm(tm_lecture_effectiveness, tm_discussion_based_pct, tm_practical_sessions_hours)
-    ps_score_raw, ps_sub_scores = calculate_ps(ps_placement_rate, ps_employer_reputation, ps_industry_partnerships, ps_alumni_salary, ps_entrepreneurial_success)
-    cc_score_raw, cc_sub_scores = calculate_cc(cc_inclusion_index, cc_representation_quotient, cc_student_engagement_rate, cc_retention_ratio_diverse_groups, cc_cultural_competency_completion)
-    ro_score_raw, ro_sub_scores = calculate_ro(ro_research_expenditure, ro_phd_attainment, ro_research_output_fwci, ro_lab_accessibility, ro_funding_opportunities, ro_mentorship_programs)
-
-    raw_factor_scores = {
-        "QTF": qtf_score_raw,
-        "TM": tm_score_raw,
-        "PS": ps_score_raw,
-        "CC": cc_score_raw,
-        "RO": ro_score_raw
-    }
-
-    # Generate dummy data for overall factor scores for percentile calculation
-    # This simulates a distribution of scores for other universities for each factor
-    dummy_overall_factor_scores = {
-        "QTF": np.random.uniform(0, 10, NUM_DUMMY_UNIVERSITIES),
-        "TM": np.random.uniform(0, 10, NUM_DUMMY_UNIVERSITIES),
-        "PS": np.random.uniform(0, 10, NUM_DUMMY_UNIVERSITIES),
-        "CC": np.random.uniform(0, 10, NUM_DUMMY_UNIVERSITIES),
-        "RO": np.random.uniform(0, 10, NUM_DUMMY_UNIVERSITIES),
-    }
-
-    adjusted_factor_scores = {}
-    for factor, score_raw in raw_factor_scores.items():
-        # Add the current university's score to the dummy data for percentile calculation
-        temp_data_for_percentile = np.append(dummy_overall_factor_scores[factor], score_raw)
-        
-        # Calculate percentile rank for the raw factor score (0-1 scale)
-        percentile_rank_factor = percentile_score(score_raw, temp_data_for_percentile) / 10 
-        
-        # Peer-Adjusted Scoring: F_i' = 0.7 * F_i + 0.3 * Percentile(F_i)
-        # Note: Percentile(F_i) in the formula is on a 0-10 scale, so we multiply percentile_rank_factor by 10
-        adjusted_factor_scores[factor] = (0.7 * score_raw) + (0.3 * percentile_rank_factor * 10) 
-
-    # Non-Linear Aggregation
-    # Base Score: Base = sum(w_i * F_i')
-    base_score = sum(current_weights[f] * adjusted_factor_scores[f] for f in raw_factor_scores)
-
-    # Synergy Bonus: If >=3 factors score >7
-    high_scoring_factors = [score for score in adjusted_factor_scores.values() if score > 7]
-    synergy_bonus = 0
-    if len(high_scoring_factors) >= 3:
-        # Take the average of the top 3 high-scoring factors
-        avg_top_3 = np.mean(sorted(high_scoring_factors, reverse=True)[:3])
-        synergy_bonus = 0.5 * (avg_top_3 - 7)
-        if synergy_bonus < 0: synergy_bonus = 0  # Ensure bonus is not negative
-
-    # Penalty: For any factor <3
-    failing_factors_count = sum(1 for score in adjusted_factor_scores.values() if score < 3)
-    penalty = 0.2 * failing_factors_count
-
-    # Final Score (0-10 scale)
-    final_score_0_10 = base_score + synergy_bonus - penalty
-    
-    # Ensure final score is within 0-10 range
-    final_score_0_10 = max(0, min(10, final_score_0_10))
-
-    # Scale to 1000 max
-    final_score_1000 = (final_score_0_10 / 10) * MAX_SCORE
-    
-    st.markdown(f"## Final University Score: **{final_score_1000:.2f} / {MAX_SCORE}**")
-    
-    with st.expander("Calculation Results"):    
+# Input sections live in a form so editing them doesn't rerun the app until it is submitted
+with st.form("compute"):
+    # Input sections for each factor in main columns
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.subheader("Factor 1: Quality of Teaching Faculty (QTF)")
+        qtf_expertise_h_index = st.number_input("Expertise (h-index, e.g., 1-50)", min_value=1.0, max_value=50.0, value=25.0, step=1.0, key="qtf_exp")
+        qtf_clarity_avg_rating = st.number_input("Clarity (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.0, step=0.1, key="qtf_clarity")
+        qtf_approachability_feedback_score = st.number_input("Approachability (Student Feedback Score 0-10)", min_value=0.0, max_value=10.0, value=7.0, step=0.1, key="qtf_app")
+
+    with col2:
+        st.subheader("Factor 2: Teaching Methods (TM)")
+        tm_lecture_effectiveness = st.number_input("Lecture Effectiveness (0-10)", min_value=0.0, max_value=10.0, value=7.5, step=0.1, key="tm_lec")
+        tm_discussion_based_pct = st.number_input("Discussion-based (% courses with seminars 0-10)", min_value=0.0, max_value=10.0, value=6.0, step=0.1, key="tm_disc")
+        tm_practical_sessions_hours = st.number_input("Practical Sessions (Lab/fieldwork hours per course 0-10)", min_value=0.0, max_value=10.0, value=8.0, step=0.1, key="tm_prac")
+
+    with col3:
+        st.subheader("Factor 3: University's Placement Services (PS)")
+        ps_placement_rate = st.number_input("Graduate Employment Rate (e.g., 0.5-0.99)", min_value=0.0, max_value=1.0, value=0.85, step=0.01, key="ps_place")
+        ps_employer_reputation = st.number_input("Employer Reputation (Avg. Rating 1-5)", min_value=1.0, max_value=5.0, value=3.8, step=0.1, key="ps_emp")
+        ps_industry_partnerships = st.number_input("Industry Partnerships (Number, e.g., 0-100)", min_value=0, max_value=100, value=50, step=1, key="ps_ind")
+        ps_alumni_salary = st.number_input("Alumni Career Progression (Avg. Salary, e.g., 50000-200000)", min_value=0.0, max_value=300000.0, value=75000.0, step=1000.0, key="ps_alumni")
+        ps_entrepreneurial_success = st.number_input("Entrepreneurial Success (Number of student-founded ventures, e.g., 0-20)", min_value=0, max_value=50, value=5, step=1, key="ps_ent")
+
+    col4, col5 = st.columns(2)
+
+    with col4:
+        st.subheader("Factor 4: Campus Culture (CC)")
+        cc_inclusion_index = st.number_input("Inclusion Index (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.2, step=0.1, key="cc_inc")
+        cc_representation_quotient = st.number_input("Representation Quotient (% diverse students/faculty 0-10)", min_value=0.0, max_value=10.0, value=7.0, step=0.1, key="cc_rep")
+        cc_student_engagement_rate = st.number_input("Student Engagement Rate (% active in clubs/activities 0-10)", min_value=0.0, max_value=10.0, value=8.0, step=0.1, key="cc_eng")
+        cc_retention_ratio_diverse_groups = st.number_input("Retention Ratio of Diverse Groups (% retained 0-10)", min_value=0.0, max_value=10.0, value=7.5, step=0.1, key="cc_ret")
+        cc_cultural_competency_completion = st.number_input("Cultural Competency Training Completion (% students 0-10)", min_value=0.0, max_value=10.0, value=6.5, step=0.1, key="cc_cult")
+
+    with col5:
+        st.subheader("Factor 5: Research Opportunities (RO)")
+        ro_research_expenditure = st.number_input("Research Expenditure (per student, e.g., 1000-50000)", min_value=0.0, max_value=100000.0, value=25000.0, step=100.0, key="ro_exp")
+        ro_phd_attainment = st.number_input("PhD Attainment (Number of PhDs conferred annually, e.g., 10-500)", min_value=0, max_value=1000, value=200, step=1, key="ro_phd")
+        ro_research_output_fwci = st.number_input("Research Output (FWCI/CNCI, e.g., 0.1-5.0)", min_value=0.0, max_value=10.0, value=2.5, step=0.1, key="ro_fwci")
+        ro_lab_accessibility = st.number_input("Lab/Resource Accessibility (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.5, step=0.1, key="ro_lab")
+        ro_funding_opportunities = st.number_input("Funding Opportunities (Avg. internal/external grants per student, e.g., 0-10000)", min_value=0.0, max_value=20000.0, value=5000.0, step=100.0, key="ro_fund")
+        ro_mentorship_programs = st.number_input("Mentorship Programs (Avg. Student Rating 1-5)", min_value=1.0, max_value=5.0, value=4.0, step=0.1, key="ro_ment")
+
+    st.markdown("---")
+
+    if weight_scheme == "Custom":
+        st.caption("Uses the applied custom weights shown in the sidebar.")
+    submitted = st.form_submit_button("Calculate University Score")
+
+if submitted:
+    # Remember the submitted inputs; the result is looked up from the cached _score_all on each rerun
+    st.session_state["last_inputs"] = (
+        qtf_expertise_h_index, qtf_clarity_avg_rating, qtf_approachability_feedback_score,
+        tm_lecture_effectiveness, tm_discussion_based_pct, tm_practical_sessions_hours,
+        ps_placement_rate, ps_employer_reputation, ps_industry_partnerships, ps_alumni_salary, ps_entrepreneurial_success,
+        cc_inclusion_index, cc_representation_quotient, cc_student_engagement_rate, cc_retention_ratio_diverse_groups, cc_cultural_competency_completion,
+        ro_research_expenditure, ro_phd_attainment, ro_research_output_fwci, ro_lab_accessibility, ro_funding_opportunities, ro_mentorship_programs
+    )
+
+last_inputs = st.session_state.get("last_inputs")
+if last_inputs is not None:
+    # Always scored against the current (committed) weights, so switching the scheme or applying
+    # custom weights updates the result from the cache without resubmitting the inputs
+    last_calc = _score_all(last_inputs, tuple(weights_vec.tolist()))
+
+    st.markdown(f"## Final University Score: **{last_calc['final_score_1000']:.2f} / {MAX_SCORE}**")
+
+    with st.expander("Calculation Results"):
 
         st.subheader("Sub-Metric Scores (0-10 Scale)")
         st.json({
-            "Quality of Teaching Faculty": {k: f"{v:.2f}" for k, v in qtf_sub_scores.items()},
-            "Teaching Methods": {k: f"{v:.2f}" for k, v in tm_sub_scores.items()},
-            "Placement Services": {k: f"{v:.2f}" for k, v in ps_sub_scores.items()},
-            "Campus Culture": {k: f"{v:.2f}" for k, v in cc_sub_scores.items()},
-            "Research Opportunities": {k: f"{v:.2f}" for k, v in ro_sub_scores.items()}
+            section: {k: f"{v:.2f}" for k, v in zip(labels, sub_scores)}
+            for (section, labels), sub_scores in zip(SUB_SCORE_SECTIONS, last_calc["sub_scores"])
         })
 
         st.subheader("Raw Factor Scores (0-10 Scale)")
-        st.json({f: f"{s:.2f}" for f, s in raw_factor_scores.items()})
+        st.json({f: f"{s:.2f}" for f, s in last_calc["raw_factor_scores"].items()})
 
         st.subheader("Peer-Adjusted Factor Scores (0-10 Scale)")
-        st.json({f: f"{s:.2f}" for f, s in adjusted_factor_scores.items()})
+        st.json({f: f"{s:.2f}" for f, s in last_calc["adjusted_factor_scores"].items()})
 
         st.subheader("Non-Linear Aggregation Details")
-        st.write(f"Base Score: {base_score:.2f}")
-        st.write(f"Synergy Bonus: {synergy_bonus:.2f}")
-        st.write(f"Penalty: {penalty:.2f}")
+        st.write(f"Base Score: {last_calc['base_score']:.2f}")
+        st.write(f"Synergy Bonus: {last_calc['synergy_bonus']:.2f}")
+        st.write(f"Penalty: {last_calc['penalty']:.2f}")
 
 
 # Documentation